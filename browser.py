@@ -1,71 +1,145 @@
 import sys
 import re
+import html
 import traceback
+from collections import OrderedDict
+from functools import lru_cache
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QToolBar, QLineEdit, QPushButton,
-    QTabWidget, QWidget, QVBoxLayout, QHBoxLayout, QLabel
+    QTabWidget, QTabBar, QWidget, QVBoxLayout, QHBoxLayout, QLabel
 )
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import Qt, QUrl, QTimer, QSignalBlocker
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtWebEngineCore import QWebEnginePage
+from PyQt6.QtWebEngineCore import (
+    QWebEnginePage, QWebEngineProfile,
+    QWebEngineUrlRequestInfo, QWebEngineUrlRequestInterceptor
+)
 
 # ----------------------------
 # CONFIG
 # ----------------------------
 GITHUB_BASE = "https://datlittladucky.github.io/Websites/"
 START_PAGE = f"{GITHUB_BASE}start/index.html"
+_BASE_LEN = len(GITHUB_BASE)
+HTTP_CACHE_SIZE = 256 * 1024 * 1024
+MAX_LIVE_TABS = 20  # older background tabs get hibernated past this
+
+# Host is anchored as "label(.label)*.tld" so each dot has exactly one place
+# it can match; no nested quantifiers for a hostile URL to backtrack through.
+_VALID_RE = re.compile(
+    r"^(?:https?://)?"
+    r"[a-zA-Z0-9-]+(?:\.[a-zA-Z0-9-]+)*\.(?:com|org|co\.uk)"
+    r"(?:/[a-zA-Z0-9_\-/]*)?$"
+)
+_SCHEME_RE = re.compile(r"https?://(.+)")
+
+_HTML_404 = """
+<html>
+    <head>
+        <style>
+            body {{
+                background-color: #111;
+                color: white;
+                font-family: Arial;
+                text-align: center;
+                margin-top: 15%;
+                will-change: opacity, transform;
+            }}
+            h1 {{
+                font-size: 60px;
+                color: red;
+            }}
+            p {{
+                font-size: 20px;
+                color: #ccc;
+            }}
+        </style>
+    </head>
+    <body>
+        <h1>404</h1>
+        <p>{message}</p>
+        <p>The requested site does not exist.</p>
+    </body>
+</html>
+"""
 
 # ----------------------------
 # VALIDATION
 # ----------------------------
 def validate_input(user_input):
-    pattern = r"^(https?://)?([a-zA-Z0-9-]+\.)+(com|co\.uk|org)(/[a-zA-Z0-9\-_/]*)?$"
-    return re.match(pattern, user_input)
+    return _VALID_RE.match(user_input)
 
 def parse_input(user_input):
-    user_input = user_input.replace("http://", "").replace("https://", "")
-    user_input = user_input.strip("/")
+    if user_input.startswith("https://"):
+        user_input = user_input[8:]
+    elif user_input.startswith("http://"):
+        user_input = user_input[7:]
+    user_input = user_input.rstrip("/")
 
-    parts = user_input.split("/", 1)
-    domain = parts[0]
-    subpath = parts[1] if len(parts) > 1 else ""
+    domain, _, subpath = user_input.partition("/")
     return domain, subpath
 
+# Maps an external-looking URL to its GitHub page URL, or None.
+# Cached since WebEngine asks about the same URLs over and over.
+@lru_cache(maxsize=1024)
+def _rewrite(url_str):
+    match = _SCHEME_RE.match(url_str)
+    if not match:
+        return None
+
+    user_input = match.group(1)
+    if not validate_input(user_input):
+        return None
+
+    domain, subpath = parse_input(user_input)
+    if subpath:
+        return f"{GITHUB_BASE}{domain}/{subpath}.html"
+    return f"{GITHUB_BASE}{domain}/index.html"
+
 # ----------------------------
-# CUSTOM PAGE: blocks external browsing
+# REQUEST INTERCEPTOR: blocks external browsing
 # ----------------------------
-class CustomWebEnginePage(QWebEnginePage):
-    def __init__(self, browser_instance):
-        super().__init__()
-        self.browser_instance = browser_instance
+_NAVIGATION_TYPES = (
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeMainFrame,
+    QWebEngineUrlRequestInfo.ResourceType.ResourceTypeSubFrame,
+)
+# Needed by setHtml (our 404 page) and blank frames
+_ALLOWED_SCHEMES = ("data", "about")
 
-    def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+class UrlRewriteInterceptor(QWebEngineUrlRequestInterceptor):
+    def interceptRequest(self, info):
+        # Page/frame navigations only; leave other subresources alone
+        if info.resourceType() not in _NAVIGATION_TYPES:
+            return
+
+        url = info.requestUrl()
         url_str = url.toString()
 
         # Allow internal GitHub pages
         if url_str.startswith(GITHUB_BASE):
-            return True
+            return
 
         # Catch ANY https://example.com style navigation
-        match = re.match(r"https?://(.+)", url_str)
-        if match:
-            user_input = match.group(1)
-
-            if validate_input(user_input):
-                domain, subpath = parse_input(user_input)
+        new_url = _rewrite(url_str)
+        if new_url:
+            info.redirect(QUrl(new_url))
+        elif url.scheme() not in _ALLOWED_SCHEMES:
+            info.block(True)
 
-                if subpath:
-                    new_url = f"{GITHUB_BASE}{domain}/{subpath}.html"
-                    virtual_url = f"{domain}/{subpath}"
-                else:
-                    new_url = f"{GITHUB_BASE}{domain}/index.html"
-                    virtual_url = domain
-
-                self.browser_instance.virtual_url = virtual_url
-                self.browser_instance.setUrl(QUrl(new_url))
-                return False
+# ----------------------------
+# CUSTOM PAGE: ignores unmapped links instead of failing the load
+# ----------------------------
+class CustomWebEnginePage(QWebEnginePage):
+    def acceptNavigationRequest(self, url, nav_type, is_main_frame):
+        # Frames are left to the interceptor; blocking one doesn't fail the page
+        if not is_main_frame:
+            return True
+        if url.scheme() in _ALLOWED_SCHEMES:
+            return True
 
-        return False
+        # The interceptor does the actual redirect for rewritable URLs
+        url_str = url.toString()
+        return url_str.startswith(GITHUB_BASE) or _rewrite(url_str) is not None
 
 # ----------------------------
 # BROWSER TAB
@@ -77,80 +151,165 @@ class BrowserTab(QWidget):
 
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.layout)
+
+        # The web view covers the whole tab, so skip clearing our background
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent, True)
+        self.setAttribute(Qt.WidgetAttribute.WA_NoSystemBackground, True)
+
+        # The web view is only built once the tab is actually shown
+        self.browser = None
+        self._pending_url = None
+        self._pending_virtual_url = ""
+        self._pending_scroll = None
+
+        # Title changes arrive in bursts while loading; only apply the last one
+        self._title = ""
+        self._title_timer = QTimer(self)
+        self._title_timer.setSingleShot(True)
+        self._title_timer.setInterval(0)
+        self._title_timer.timeout.connect(self._do_update_tab_title)
+
+        # Title of the page currently loading, for the 404 check
+        self._last_title = ""
+
+    def ensure_browser(self):
+        if self.browser is not None:
+            return self.browser
 
         self.browser = QWebEngineView()
-        QApplication.processEvents()  # ensure engine is initialized
-        self.browser.setPage(CustomWebEnginePage(self.browser))
+        profile = self.parent_tabs.window().profile
+        self.browser.setPage(CustomWebEnginePage(profile, self.browser))
 
         # Virtual URL storage
-        self.browser.virtual_url = ""
+        self.browser.virtual_url = self._pending_virtual_url
 
         # Signals
         self.browser.titleChanged.connect(self.update_tab_title)
+        self.browser.loadStarted.connect(self.forget_title)
         self.browser.urlChanged.connect(self.sync_virtual_url)
         self.browser.loadFinished.connect(self.check_load_success)
 
         self.layout.addWidget(self.browser)
-        self.setLayout(self.layout)
+
+        if self._pending_url:
+            self.browser.setUrl(QUrl(self._pending_url))
+            self._pending_url = None
+        else:
+            # Nothing to restore, so no load to apply the scroll position to
+            self._pending_scroll = None
+        return self.browser
+
+    def hibernate(self):
+        # Drop the web view (and its renderer) but remember where we were
+        if self.browser is None:
+            return
+        self._pending_url = self.browser.url().toString()
+        self._pending_virtual_url = self.browser.virtual_url
+        self._pending_scroll = self.browser.page().scrollPosition()
+
+        # The view lives on until deleteLater runs; keep it from calling back,
+        # including the loadFinished(False) that stop() may emit
+        self.browser.titleChanged.disconnect(self.update_tab_title)
+        self.browser.loadStarted.disconnect(self.forget_title)
+        self.browser.urlChanged.disconnect(self.sync_virtual_url)
+        self.browser.loadFinished.disconnect(self.check_load_success)
+        self.browser.stop()
+
+        self.layout.removeWidget(self.browser)
+        self.browser.deleteLater()
+        self.browser = None
+
+    def showEvent(self, event):
+        self.ensure_browser()
+        super().showEvent(event)
 
     def update_tab_title(self, title):
+        self._title = title
+        self._last_title = title
+        self._title_timer.start()
+
+    def forget_title(self):
+        # So the 404 check never sees the previous page's title
+        self._last_title = ""
+
+    def _do_update_tab_title(self):
         index = self.parent_tabs.indexOf(self)
+        title = self._title
         if title and title.strip():
             self.parent_tabs.setTabText(index, title[:40])
         else:
             self.parent_tabs.setTabText(index, "Untitled")
 
     def sync_virtual_url(self, qurl):
-        url = qurl.toString()
-        if url.startswith(GITHUB_BASE):
-            stripped = url.replace(GITHUB_BASE, "")
-            stripped = stripped.replace(".html", "")
-            stripped = stripped.strip("/")
-            self.browser.virtual_url = stripped
+        # Suffix checks need the bare page URL; query/fragment go back on after
+        url = qurl.adjusted(
+            QUrl.UrlFormattingOption.RemoveQuery | QUrl.UrlFormattingOption.RemoveFragment
+        ).toString()
+        if not url.startswith(GITHUB_BASE):
+            return
+        url = url[_BASE_LEN:]
+        if url.endswith("/index.html"):
+            url = url[:-11]
+        elif url.endswith(".html"):
+            url = url[:-5]
+        url = url.strip("/")
+
+        if qurl.hasQuery():
+            url = f"{url}?{qurl.query()}"
+        if qurl.hasFragment():
+            url = f"{url}#{qurl.fragment()}"
+        self.browser.virtual_url = url
 
     def check_load_success(self, success):
         if not success:
-            self.show_custom_404("Page failed to load")
+            self._pending_scroll = None
+            # Let the failed load unwind before starting the 404 page load
+            QTimer.singleShot(0, self.show_load_failed)
             return
-        # Detect GitHub Pages 404 by title
-        self.browser.page().runJavaScript(
-            "document.title", self.check_title_for_404
-        )
-
-    def check_title_for_404(self, title):
-        if title and "404" in title:
+        # Coming back from hibernation
+        if self._pending_scroll is not None:
+            pos = self._pending_scroll
+            self._pending_scroll = None
+            self.browser.page().runJavaScript(f"window.scrollTo({pos.x()}, {pos.y()})")
+        # Detect GitHub Pages 404 by the title titleChanged last gave us. It
+        # can land just after loadFinished, so look on the next tick.
+        QTimer.singleShot(0, self.check_title_for_404)
+
+    def check_title_for_404(self):
+        if self.browser is None:
+            return
+        # Only GitHub pages: untitled pages (like our own 404 page) report
+        # their URL as the title, which may contain "404" itself
+        url_str = self.browser.url().toString()
+        if not url_str.startswith(GITHUB_BASE):
+            return
+        title = self._last_title
+        # Qt fell back to the URL (possibly without its scheme), so no real title
+        if not title or url_str.endswith(title):
+            return
+        if "404" in title:
             self.show_custom_404("Page not found")
 
+    def show_load_failed(self):
+        # Hibernated in the meantime; don't bring the view back just for this
+        if self.browser is None:
+            return
+        self.show_custom_404("Page failed to load")
+
     def show_custom_404(self, message):
-        html = f"""
-        <html>
-            <head>
-                <style>
-                    body {{
-                        background-color: #111;
-                        color: white;
-                        font-family: Arial;
-                        text-align: center;
-                        margin-top: 15%;
-                    }}
-                    h1 {{
-                        font-size: 60px;
-                        color: red;
-                    }}
-                    p {{
-                        font-size: 20px;
-                        color: #ccc;
-                    }}
-                </style>
-            </head>
-            <body>
-                <h1>404</h1>
-                <p>{message}</p>
-                <p>The requested site does not exist.</p>
-            </body>
-        </html>
-        """
-        self.browser.setHtml(html)
+        self.ensure_browser().setHtml(_HTML_404.format(message=html.escape(message)))
+
+# ----------------------------
+# TAB BAR: switch tabs on press, not release
+# ----------------------------
+class FastTabBar(QTabBar):
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            index = self.tabAt(event.position().toPoint())
+            if index >= 0:
+                self.setCurrentIndex(index)
+        super().mousePressEvent(event)
 
 # ----------------------------
 # MAIN WINDOW
@@ -163,11 +322,33 @@ class MiniBrowser(QMainWindow):
 
         # Tabs
         self.tabs = QTabWidget()
+        self.tabs.setTabBar(FastTabBar())
         self.tabs.setTabsClosable(True)
         self.tabs.tabCloseRequested.connect(self.close_tab)
         self.tabs.currentChanged.connect(self.update_url_bar)
+        self.tabs.currentChanged.connect(self.mark_tab_used)
+        self._lru = OrderedDict()  # live tabs, least recently used first
+        self._current_browser = None
         self.setCentralWidget(self.tabs)
 
+        # One on-disk profile shared by every tab, so cache and cookies are reused.
+        # Created after the tabs are parented here: Qt deletes children in order,
+        # so every page goes away before the profile does.
+        self.profile = QWebEngineProfile("mini", self)
+        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.DiskHttpCache)
+        self.profile.setPersistentCookiesPolicy(
+            QWebEngineProfile.PersistentCookiesPolicy.AllowPersistentCookies
+        )
+        self.profile.setHttpCacheMaximumSize(HTTP_CACHE_SIZE)
+        self.interceptor = UrlRewriteInterceptor(self)
+        self.profile.setUrlRequestInterceptor(self.interceptor)
+
+        # Rapid tab switches only refresh the URL bar for the final tab
+        self._url_update_timer = QTimer(self)
+        self._url_update_timer.setSingleShot(True)
+        self._url_update_timer.setInterval(0)
+        self._url_update_timer.timeout.connect(self._do_update_url_bar)
+
         # Toolbar
         toolbar = QToolBar()
         self.addToolBar(toolbar)
@@ -175,17 +356,17 @@ class MiniBrowser(QMainWindow):
         # Back / Forward / Refresh
         self.back_btn = QPushButton("←")
         self.back_btn.setFixedWidth(40)
-        self.back_btn.clicked.connect(lambda: self.current_browser().back())
+        self.back_btn.clicked.connect(self._back)
         toolbar.addWidget(self.back_btn)
 
         self.forward_btn = QPushButton("→")
         self.forward_btn.setFixedWidth(40)
-        self.forward_btn.clicked.connect(lambda: self.current_browser().forward())
+        self.forward_btn.clicked.connect(self._forward)
         toolbar.addWidget(self.forward_btn)
 
         self.refresh_btn = QPushButton("⟳")
         self.refresh_btn.setFixedWidth(40)
-        self.refresh_btn.clicked.connect(lambda: self.current_browser().reload())
+        self.refresh_btn.clicked.connect(self._reload)
         toolbar.addWidget(self.refresh_btn)
 
         # URL bar with fake HTTPS lock
@@ -215,18 +396,56 @@ class MiniBrowser(QMainWindow):
 
     # ----------------------------
     def current_browser(self):
-        return self.tabs.currentWidget().browser
+        return self.tabs.currentWidget().ensure_browser()
 
     def add_tab(self, start_url=None):
-        new_tab = BrowserTab(self.tabs)
-        index = self.tabs.addTab(new_tab, "New Tab")
-        self.tabs.setCurrentIndex(index)
-        if start_url:
-            new_tab.browser.setUrl(QUrl(start_url))
+        # Nothing reacts to currentChanged until the tab is fully in place
+        with QSignalBlocker(self.tabs):
+            new_tab = BrowserTab(self.tabs)
+            new_tab._pending_url = start_url
+            index = self.tabs.addTab(new_tab, "New Tab")
+            self.tabs.setCurrentIndex(index)
+        # Builds the tab's browser and loads the pending URL
+        self.mark_tab_used(index)
+        self._do_update_url_bar()
 
     def close_tab(self, index):
         if self.tabs.count() > 1:
-            self.tabs.removeTab(index)
+            tab = self.tabs.widget(index)
+            with QSignalBlocker(self.tabs):
+                self.tabs.removeTab(index)
+            self._lru.pop(tab, None)
+            tab.deleteLater()
+            self.mark_tab_used(self.tabs.currentIndex())
+            self._do_update_url_bar()
+
+    def mark_tab_used(self, index):
+        tab = self.tabs.widget(index)
+        if tab is None:
+            return
+        self._lru[tab] = None
+        self._lru.move_to_end(tab)
+        # The current tab is never hibernated, so this stays valid until the next switch
+        self._current_browser = tab.ensure_browser()
+        self._maybe_discard()
+
+    def _maybe_discard(self):
+        # The current tab was just moved to the end, so it is never picked
+        while len(self._lru) > MAX_LIVE_TABS:
+            tab, _ = self._lru.popitem(last=False)
+            tab.hibernate()
+
+    def _back(self):
+        if self._current_browser is not None:
+            self._current_browser.back()
+
+    def _forward(self):
+        if self._current_browser is not None:
+            self._current_browser.forward()
+
+    def _reload(self):
+        if self._current_browser is not None:
+            self._current_browser.reload()
 
     # ----------------------------
     def load_page(self):
@@ -256,11 +475,10 @@ class MiniBrowser(QMainWindow):
         self.tabs.setTabText(self.tabs.currentIndex(), domain)
 
     def update_url_bar(self, index):
-        browser = self.current_browser()
-        if hasattr(browser, "virtual_url"):
-            self.url_bar.setText(browser.virtual_url)
-        else:
-            self.url_bar.setText("")
+        self._url_update_timer.start()
+
+    def _do_update_url_bar(self):
+        self.url_bar.setText(self.current_browser().virtual_url)
 
     def current_tab(self):
         return self.tabs.currentWidget()